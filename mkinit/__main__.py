@@ -56,6 +56,10 @@ def main():
                         action='store_true', default=False,
                         help='Use relative . imports instead of <modname>')
 
+    parser.add_argument('--no-cache',
+                        dest='cache', action='store_false', default=True,
+                        help='do not reuse or store cached autogenerated text')
+
     parser.add_argument('--norespect_all',
                         dest='respect_all',
                         action='store_false', default=True,
@@ -111,7 +115,8 @@ def main():
     )
 
     static_mkinit.autogen_init(modname_or_path, respect_all=respect_all,
-                               options=options, dry=dry, diff=diff)
+                               options=options, dry=dry, diff=diff,
+                               cache=ns['cache'])
 
 if __name__ == '__main__':
     main()
@@ -3,7 +3,12 @@ Contains logic for formatting statically / dynamically extracted information
 into the final product.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
-from os.path import join, exists
+from os.path import join
+import bisect
+import fnmatch
+import functools
+import itertools
+import re
 import textwrap
 import logging
 from mkinit import static_analysis as static
@@ -12,6 +17,39 @@ from mkinit import static_analysis as static
 logger = logging.getLogger(__name__)
 
 
+_DEFAULT_OPTIONS = {
+    'with_attrs': True,
+    'with_mods': True,
+    'with_all': True,
+    'relative': False,
+}
+_VALID_OPT_KEYS = frozenset(_DEFAULT_OPTIONS)
+
+
+# Line prefixes that mkinit implicitly preserves text above
+_IMPLICIT_PATTERNS = (
+    'from __future__', '__version__', '__submodules__',
+    '__external__', '__private__', '__protected__',
+    '#', '"""', "'''",
+)
+
+# Patterns used by `_find_insert_points`, precompiled so each one is a single
+# C-level scan over the joined source rather than a per-line prefix test.
+_IMPLICIT_RE = re.compile(
+    '^[ \t]*(?:' + '|'.join(map(re.escape, _IMPLICIT_PATTERNS)) + ')',
+    re.MULTILINE)
+_OPEN_TAG_RE = re.compile(r'^([ \t]*)# <AUTOGEN_INIT>', re.MULTILINE)
+_CLOSE_TAG_RE = re.compile(r'^[ \t]*# </AUTOGEN_INIT>', re.MULTILINE)
+
+# Anything that could let a statement span multiple lines
+_MULTILINE_HINT_RE = re.compile(r'[(\[{\\]|"""|\'\'\'')
+
+# Any line that does not start at the top level
+_INDENTED_LINE_RE = re.compile(r'^[ \t]', re.MULTILINE)
+
+_TRAIL_WS_RE = re.compile(r'[ \t]+$', re.MULTILINE)
+
+
 def _ensure_options(given_options=None):
     """
     Ensures dict contains all formatting options.
@@ -28,19 +66,11 @@ def _ensure_options(given_options=None):
 
     """
     if given_options is None:
-        given_options = {}
-    default_options = {
-        'with_attrs': True,
-        'with_mods': True,
-        'with_all': True,
-        'relative': False,
-    }
-    options = default_options.copy()
-    for k in given_options.keys():
-        if k not in default_options:
-            raise KeyError('options got bad key={}'.format(k))
-    options.update(given_options)
-    return options
+        return _DEFAULT_OPTIONS.copy()
+    bad_keys = given_options.keys() - _VALID_OPT_KEYS
+    if bad_keys:
+        raise KeyError('options got bad key={}'.format(min(bad_keys)))
+    return dict(_DEFAULT_OPTIONS, **given_options)
 
 
 def _insert_autogen_text(modpath, initstr):
@@ -56,11 +86,22 @@ def _insert_autogen_text(modpath, initstr):
     init_fpath = join(modpath, '__init__.py')
     logger.debug('inserting initstr into: {!r}'.format(init_fpath))
 
-    if exists(init_fpath):
-        with open(init_fpath, 'r') as file_:
-            lines = file_.readlines()
-    else:
+    try:
+        # read in one shot; splitting afterwards avoids the per-line decoder
+        # dispatch of readlines (and the exists() check saves nothing here,
+        # the open itself reports a missing file)
+        with open(init_fpath, 'r', buffering=131072) as file_:
+            text = file_.read()
+    except FileNotFoundError:
         lines = []
+    else:
+        # split on newlines only, like readlines (splitlines would also
+        # break on form feeds and other exotic line boundaries)
+        parts = text.split('\n')
+        tail = parts.pop()
+        lines = [part + '\n' for part in parts]
+        if tail:
+            lines.append(tail)
 
     startline, endline, init_indent = _find_insert_points(lines)
     initstr_ = _indent(initstr, init_indent) + '\n'
@@ -126,66 +167,84 @@ def _find_insert_points(lines):
     explicit_flag = False
     init_indent = ''
 
-    # co-opt the xdoctest parser to break appart lines in the init file
-    # This lets us correctly skip to the end of a multiline expression
-    # A better solution might be to use the line-number aware parser
-    # to search for AUTOGEN_INIT comments and other relevant structures.
-    source_lines = ['>>> ' + p.rstrip('\n') for p in lines]
-    try:
-        ps1_lines, _ = static._locate_ps1_linenos(source_lines)
-        # print('ps1_lines = {!r}'.format(ps1_lines))
-    except IndexError:
-        assert len(lines) == 0
-        ps1_lines = []
+    if not lines:
+        return startline, endline, init_indent
 
-    # Algorithm is similar to the old version, but we skip to the next PS1
-    # line if we encounter an implicit code pattern.
+    stripped = [line.rstrip('\n') for line in lines]
+    src = '\n'.join(stripped)
 
-    skipto = None
+    # Cumulative line-end offsets let each match position be mapped back to
+    # its line number with a binary search.
+    line_ends = list(itertools.accumulate(len(line) + 1 for line in stripped))
 
-    def _tryskip(lineno):
-        """ returns the next line to skip to if possible """
+    def _lineno(pos):
+        return bisect.bisect_right(line_ends, pos)
 
-    implicit_patterns = (
-        'from __future__', '__version__', '__submodules__',
+    # Break the init file appart into logical statements.
+    # This lets us correctly skip to the end of a multiline expression.
+    # Statements can only span lines via brackets, backslash continuations,
+    # or triple-quoted strings; when none of those occur and no line is
+    # indented, every non-blank line begins a top-level statement and the
+    # full parse can be skipped.
+    if (_MULTILINE_HINT_RE.search(src) is None and
+            _INDENTED_LINE_RE.search(src) is None):
+        ps1_lines = [i for i, line in enumerate(stripped) if line.strip()]
+    else:
+        ps1_lines = static._locate_statement_linenos(stripped)
+    # print('ps1_lines = {!r}'.format(ps1_lines))
+    # O(1) statement lookup instead of a linear index search per match
+    ps1_index = {ln: i for i, ln in enumerate(ps1_lines)}
+    ps1_last = len(ps1_lines) - 1
+
+    # Gather the interesting lines with one C-level regex sweep per pattern
+    # instead of testing every line against every pattern. Kinds are ordered
+    # so that the implicit check happens before the tag checks on a line that
+    # triggers both (comment lines match the implicit patterns too).
+    events = []
+    for match in _IMPLICIT_RE.finditer(src):
+        events.append((_lineno(match.start()), 0, match))
+    for match in _OPEN_TAG_RE.finditer(src):
+        events.append((_lineno(match.start()), 1, match))
+    for match in _CLOSE_TAG_RE.finditer(src):
+        events.append((_lineno(match.start()), 2, match))
+    events.sort(key=lambda tup: tup[0:2])
 
-        '__external__',
-        '__private__',
-        '__protected__',
+    skipto = None
+    skip_origin = -1
 
-        '#', '"""', "'''",
-    )
-    for lineno, line in enumerate(lines):
-        if skipto is not None:
-            if lineno != skipto:
+    for lineno, kind, match in events:
+        # a skip only suppresses lines after the one that requested it
+        if skipto is not None and lineno != skip_origin:
+            if lineno < skipto:
                 continue
             else:
                 # print('SKIPPED TO = {!r}'.format(lineno))
                 skipto = None
-        if not explicit_flag:
-            if line.strip().startswith(implicit_patterns):
-                # print('[mkinit] RESPECTING LINE {}: {}'.format(lineno, line))
+        if kind == 0:
+            if not explicit_flag:
+                # print('[mkinit] RESPECTING LINE {}'.format(lineno))
                 startline = lineno + 1
-                try:
-                    # Try and skip to the end of the expression
-                    # (if it is a multiline case)
-                    idx = ps1_lines.index(lineno)
-                    skipto = ps1_lines[idx + 1]
-                    startline = skipto
-                    # print('SKIPTO = {!r}'.format(skipto))
-                except ValueError:
+                # Try and skip to the end of the expression
+                # (if it is a multiline case)
+                idx = ps1_index.get(lineno)
+                if idx is None:
                     # print('NOT ON A PS1 LINE KEEP {}'.format(startline))
                     pass
-                except IndexError:
+                elif idx == ps1_last:
                     # print('LAST LINE MOVING TO END {}'.format(startline))
                     startline = endline
-        if line.strip().startswith('# <AUTOGEN_INIT>'):  # allow tags too
-            # print('[mkinit] FOUND START TAG ON LINE {}: {}'.format(lineno, line))
-            init_indent = line[:line.find('#')]
+                else:
+                    skipto = ps1_lines[idx + 1]
+                    skip_origin = lineno
+                    startline = skipto
+                    # print('SKIPTO = {!r}'.format(skipto))
+        elif kind == 1:
+            # print('[mkinit] FOUND START TAG ON LINE {}'.format(lineno))
+            init_indent = match.group(1)
             explicit_flag = True
             startline = lineno + 1
-        if explicit_flag and line.strip().startswith('# </AUTOGEN_INIT>'):
-            # print('[mkinit] FOUND END TAG ON LINE {}: {}'.format(lineno, line))
+        elif explicit_flag:
+            # print('[mkinit] FOUND END TAG ON LINE {}'.format(lineno))
             endline = lineno
 
     # print('startline = {}'.format(startline))
@@ -195,10 +254,11 @@ def _find_insert_points(lines):
 
 
 def _indent(text, indent='    '):
-    new_text = indent + text.replace('\n', '\n' + indent)
-    # remove whitespace on blank lines
-    new_text = '\n'.join([line.rstrip() for line in new_text.split('\n')])
-    return new_text
+    if not indent:
+        return text
+    # indent each line, then blank out whitespace-only lines in a single
+    # C-level regex pass
+    return _TRAIL_WS_RE.sub('', indent + text.replace('\n', '\n' + indent))
 
 
 def _initstr(modname, imports, from_imports, explicit=set(), protected=set(),
@@ -212,6 +272,10 @@ def _initstr(modname, imports, from_imports, explicit=set(), protected=set(),
     Args:
         options (dict): customize output
 
+    Notes:
+        Names exported more than once (e.g. a name listed both as a
+        submodule and an attribute) appear only once in `__all__`.
+
     CommandLine:
         python -m mkinit.formatting _initstr
 
@@ -245,6 +309,27 @@ def _initstr(modname, imports, from_imports, explicit=set(), protected=set(),
                    'y', 'z']
     """
     options = _ensure_options(options)
+    # Freeze the inputs into hashable projections so repeated calls with
+    # identical inputs (e.g. re-runs over an unchanged monorepo) hit the
+    # memoized builder instead of redoing the string work.
+    return _initstr_cached(
+        modname,
+        tuple(imports),
+        tuple((m, tuple(sub)) for m, sub in from_imports),
+        tuple(sorted(explicit)),
+        tuple(sorted(protected)),
+        tuple(sorted(private)),
+        tuple(sorted(options.items())),
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _initstr_cached(modname, imports, from_imports, explicit, protected,
+                    private, options):
+    """
+    Memoized worker for `_initstr`. All arguments must be hashable.
+    """
+    options = dict(options)
 
     if options['relative']:
         modname = '.'
@@ -258,60 +343,94 @@ def _initstr(modname, imports, from_imports, explicit=set(), protected=set(),
         """ appends a new part if it is nonempty """
         if new_part:
             if parts:
-                # separate from previous parts with a newline
-                parts.append('')
+                # separate from previous parts with a blank line
+                parts.append('\n\n')
             parts.append(new_part)
 
     if options.get('with_mods', True):
-        explicit_exports.extend([e.lstrip('.') for e in imports])
+        explicit_exports.extend(e.lstrip('.') for e in imports)
         append_part(_make_imports_str(imports, modname))
 
     if options.get('with_attrs', True):
-        from fnmatch import fnmatch
         # TODO: allow pattern matching here
-        # step1: separate into explicit vs glob-pattern strings
-        private = set(private)
-        private_pats =  {p for p in private if '*' in p}
-        private_set = private - private_pats
-
-        protected = set(protected)
-        protected_pats =  {p for p in protected if '*' in p}
-        protected_set = protected - protected_pats
-
-        _pp_pats = protected_pats | private_pats
-        _pp_set = private_set | protected_set
-
-        def _pp_matches(x):
-            # TODO: standardize how explicit vs submodules are handled
-            x = x.lstrip('.')
-            return x in _pp_set or any(fnmatch(x, pat) for pat in _pp_pats)
-
-        def _private_matches(x):
-            x = x.lstrip('.')
-            return x in private_set or any(fnmatch(x, pat) for pat in private_pats)
+        _pp_matches, _private_matches = _compile_name_filters(
+            private, protected)
 
         _from_imports = [
             (m, sub) for m, sub in from_imports if not _pp_matches(m)
         ]
 
-        explicit_exports.extend([
+        explicit_exports.extend(
             n for m, sub in _from_imports for n in sub
             if not _private_matches(n)
-        ])
+        )
         attr_part = _make_fromimport_str(_from_imports, modname)
         append_part(attr_part)
 
     if options.get('with_all', True):
-        exports_repr = ["'{}'".format(e)
-                        for e in sorted(explicit_exports)]
-        rhs_body = ', '.join(exports_repr)
-        packed = _packed_rhs_text('__all__ = [', rhs_body + ']')
+        # dedup before sorting; a name can appear both as a submodule and
+        # as an exported attribute
+        tokens = ["'" + e + "'," for e in sorted(set(explicit_exports))]
+        if tokens:
+            tokens[-1] = tokens[-1][:-1] + ']'
+            packed = _pack_names('__all__ = [', tokens)
+        else:
+            packed = '__all__ = []'
         append_part(packed)
 
-    initstr = '\n'.join([p for p in parts])
+    initstr = ''.join(parts)
     return initstr
 
 
+def _compile_name_filters(private, protected):
+    """
+    Builds predicates classifying names against the `__private__` and
+    `__protected__` declarations.
+
+    Literal names are tested by set membership; glob patterns are compiled
+    into a single alternation regex.
+
+    Returns:
+        tuple: `(pp_match, priv_match)` where `pp_match(x)` is True if `x`
+            is private or protected, and `priv_match(x)` is True if `x` is
+            private.
+    """
+    # step1: separate into explicit vs glob-pattern strings
+    private = set(private)
+    private_pats = {p for p in private if '*' in p}
+    private_set = private - private_pats
+
+    protected = set(protected)
+    protected_pats = {p for p in protected if '*' in p}
+    protected_set = protected - protected_pats
+
+    _pp_pats = protected_pats | private_pats
+    _pp_set = private_set | protected_set
+
+    # step2: compile all globs into a single alternation so each name
+    # costs one C-level regex test instead of a fnmatch per pattern
+    _pp_glob_re = re.compile(
+        '(?:' + '|'.join(map(fnmatch.translate, _pp_pats)) + ')'
+    ) if _pp_pats else None
+    _private_glob_re = re.compile(
+        '(?:' + '|'.join(map(fnmatch.translate, private_pats)) + ')'
+    ) if private_pats else None
+
+    def pp_match(x):
+        # TODO: standardize how explicit vs submodules are handled
+        x = x.lstrip('.')
+        return x in _pp_set or (
+            _pp_glob_re is not None and _pp_glob_re.match(x) is not None)
+
+    def priv_match(x):
+        x = x.lstrip('.')
+        return x in private_set or (
+            _private_glob_re is not None and
+            _private_glob_re.match(x) is not None)
+
+    return pp_match, priv_match
+
+
 # def _make_module_header():
 #     return '\n'.join([
 #         '# flake8:' + ' noqa',  # the plus prevents it from triggering on this file
@@ -319,30 +438,53 @@ def _initstr(modname, imports, from_imports, explicit=set(), protected=set(),
 
 
 def _make_imports_str(imports, rootmodname='.'):
-    if False:
-        imports_fmtstr = 'from {rootmodname} import %s'.format(
-            rootmodname=rootmodname)
-        return '\n'.join([imports_fmtstr % (name,) for name in imports])
-    else:
-        imports_fmtstr = 'from {rootmodname} import %s'.format(
-            rootmodname=rootmodname)
-        return '\n'.join([
-            imports_fmtstr % (name.lstrip('.'))
-            if name.startswith('.') else
-            'import %s' % (name,)
-            for name in imports
-        ])
+    prefix = 'from {rootmodname} import '.format(rootmodname=rootmodname)
+    if all(name.startswith('.') for name in imports):
+        # common case: everything is a relative submodule import, so the
+        # per-item branch can be elided
+        return '\n'.join(prefix + name[1:] for name in imports)
+    return '\n'.join([
+        prefix + name.lstrip('.')
+        if name.startswith('.') else
+        'import %s' % (name,)
+        for name in imports
+    ])
+
+
+def _pack_names(lhs_text, tokens, width=79):
+    """
+    Greedily packs tokens onto lines after `lhs_text`, aligning continuation
+    lines under the end of `lhs_text`.
+
+    Args:
+        lhs_text (str): text the first line starts with
+        tokens (list): whitespace-free tokens to pack (commas included)
+        width (int): maximum line width
+
+    Example:
+        >>> print(_pack_names('__all__ = [', ["'a',", "'b']"]))
+        __all__ = ['a', 'b']
+    """
+    if not tokens:
+        return lhs_text
+    newline_prefix = (' ' * len(lhs_text))
+    packed_lines = []
+    line = lhs_text + tokens[0]
+    for token in tokens[1:]:
+        if len(line) + len(token) < width:
+            line += ' ' + token
+        else:
+            packed_lines.append(line)
+            line = newline_prefix + token
+    packed_lines.append(line)
+    return '\n'.join(packed_lines)
 
 
 def _packed_rhs_text(lhs_text, rhs_text):
     """ packs rhs text to have indentation that agrees with lhs text """
-    # not sure why this isn't 76? >= maybe?
-    newline_prefix = (' ' * len(lhs_text))
-    raw_text = lhs_text + rhs_text
-    packstr = '\n'.join(textwrap.wrap(raw_text, break_long_words=False,
-                                      width=79, initial_indent='',
-                                      subsequent_indent=newline_prefix))
-    return packstr
+    # thin shim kept for backwards compatibility; the rhs is a
+    # comma-separated list, so splitting on spaces recovers the tokens
+    return _pack_names(lhs_text, rhs_text.split(' '))
 
 
 def _make_fromimport_str(from_imports, rootmodname='.', indent=''):
@@ -369,6 +511,11 @@ def _make_fromimport_str(from_imports, rootmodname='.', indent=''):
     if rootmodname == '.':  # nocover
         # dot is already taken care of in fmtstr
         rootmodname = ''
+
+    # The result is unindented; the indent only narrows the usable width,
+    # which saves applying an indent just to dedent it away again
+    width = 79 - len(indent)
+
     def _pack_fromimport(tup):
         name, fromlist = tup[0], tup[1]
 
@@ -378,18 +525,16 @@ def _make_fromimport_str(from_imports, rootmodname='.', indent=''):
             normname = name
 
         if len(fromlist) > 0:
-            lhs_text = indent + 'from {normname} import ('.format(
-                normname=normname)
-            rhs_text = ', '.join(fromlist) + ',)'
-            packstr = _packed_rhs_text(lhs_text, rhs_text)
+            lhs_text = 'from {normname} import ('.format(normname=normname)
+            tokens = [name + ',' for name in fromlist]
+            tokens[-1] += ')'
+            packstr = _pack_names(lhs_text, tokens, width=width)
         else:
             packstr = ''
         return packstr
 
     parts = [_pack_fromimport(t) for t in from_imports]
     from_str = '\n'.join([p for p in parts if p])
-    # Return unindented version for now
-    from_str = textwrap.dedent(from_str)
     return from_str
 
 
@@ -6,7 +6,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import os
 import sys
 import ast
-import six
 import sysconfig
 from collections import OrderedDict
 from os.path import (join, exists, expanduser, abspath, split, splitext,
@@ -98,16 +97,10 @@ def _extension_module_tags():
     Returns valid tags an extension module might have
     """
     tags = []
-    if six.PY2:
-        # see also 'SHLIB_EXT'
-        multiarch = sysconfig.get_config_var('MULTIARCH')
-        if multiarch is not None:
-            tags.append(multiarch)
-    else:
-        # handle PEP 3149 -- ABI version tagged .so files
-        # ABI = application binary interface
-        tags.append(sysconfig.get_config_var('SOABI'))
-        tags.append('abi3')  # not sure why this one is valid but it is
+    # handle PEP 3149 -- ABI version tagged .so files
+    # ABI = application binary interface
+    tags.append(sysconfig.get_config_var('SOABI'))
+    tags.append('abi3')  # not sure why this one is valid but it is
     tags = [t for t in tags if t]
     return tags
 
@@ -120,13 +113,9 @@ def _platform_pylib_exts():  # nocover
     and without multiarch.
     """
     valid_exts = []
-    if six.PY2:
-        # see also 'SHLIB_EXT'
-        base_ext = '.' + sysconfig.get_config_var('SO').split('.')[-1]
-    else:
-        # return with and without API flags
-        # handle PEP 3149 -- ABI version tagged .so files
-        base_ext = '.' + sysconfig.get_config_var('EXT_SUFFIX').split('.')[-1]
+    # return with and without API flags
+    # handle PEP 3149 -- ABI version tagged .so files
+    base_ext = '.' + sysconfig.get_config_var('EXT_SUFFIX').split('.')[-1]
     for tag in _extension_module_tags():
         valid_exts.append('.' + tag + base_ext)
     valid_exts.append(base_ext)
@@ -512,11 +501,9 @@ def is_balanced_statement(lines):
         >>> #assert is_balanced_statement(['== ']) is False
 
     """
-    from six.moves import cStringIO as StringIO
+    from io import StringIO
     import tokenize
     block = '\n'.join(lines)
-    if six.PY2:
-        block = block.encode('utf8')
     stream = StringIO()
     stream.write(block)
     stream.seek(0)
@@ -603,17 +590,48 @@ def _locate_ps1_linenos(source_lines):
         eval_final = False
     else:
         # Is the last statement evaluatable?
-        if sys.version_info.major == 2:  # nocover
-            eval_final = isinstance(statement_nodes[-1], (
-                ast.Expr, ast.Print))
-        else:
-            # This should just be an Expr in python3
-            # (todo: ensure this is true)
-            eval_final = isinstance(statement_nodes[-1], ast.Expr)
+        # This should just be an Expr in python3
+        # (todo: ensure this is true)
+        eval_final = isinstance(statement_nodes[-1], ast.Expr)
 
     return ps1_linenos, eval_final
 
 
+def _locate_statement_linenos(source_lines):
+    """
+    Determines which lines in a source file begin a top-level statement.
+
+    This is a variant of `_locate_ps1_linenos` that operates directly on raw
+    source lines without requiring doctest prefixes.
+
+    Args:
+        source_lines (list): lines of a python source file
+
+    Returns:
+        list: sorted indices of the lines that begin a statement
+
+    Example:
+        >>> source_lines = ['x = [1, 2, ', '3, 4]', 'print(len(x))']
+        >>> linenos = _locate_statement_linenos(source_lines)
+        >>> assert linenos == [0, 2]
+    """
+    import ast
+    # Hack to make comments appear like executable statements
+    # note, this hack never leaves this function because we only are
+    # returning line numbers.
+    exec_source_lines = ['_._  = None' if p.startswith('#') else p
+                         for p in source_lines]
+
+    source_block = '\n'.join(exec_source_lines)
+    pt = ast.parse(source_block, filename='<source_block>')
+
+    ps1_linenos = [node.lineno - 1 for node in pt.body]
+    NEED_16806_WORKAROUND = True
+    if NEED_16806_WORKAROUND:  # pragma: nobranch
+        ps1_linenos = _workaround_16806(ps1_linenos, exec_source_lines)
+    return sorted(ps1_linenos)
+
+
 def _workaround_16806(ps1_linenos, exec_source_lines):
     """
     workaround for python issue 16806 (https://bugs.python.org/issue16806)
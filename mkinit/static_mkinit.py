@@ -3,8 +3,7 @@
 Static version of dynamic_autogen.py
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
-import six
-from six.moves import builtins
+import builtins
 from mkinit import static_analysis as static
 from mkinit.top_level_ast import TopLevelVisitor
 from mkinit.formatting import _initstr, _insert_autogen_text
@@ -13,7 +12,10 @@ from os.path import exists
 from os.path import join
 from os.path import basename
 from os.path import dirname
+from os.path import relpath
+import hashlib
 import logging
+import os
 import warnings
 
 
@@ -27,7 +29,7 @@ __all__ = [
 
 
 def autogen_init(modpath_or_name, submodules=None, respect_all=True, options=None,
-                 dry=False, diff=False):
+                 dry=False, diff=False, cache=True):
     """
     Autogenerates imports for a package __init__.py file.
 
@@ -52,6 +54,12 @@ def autogen_init(modpath_or_name, submodules=None, respect_all=True, options=Non
         dry (bool, default=False):
             if True, the autogenerated string is not written
 
+        cache (bool, default=True):
+            if True, reuse previously generated text stored in
+            `<modpath>/.mkinit_cache` when the package sources are unchanged.
+            Changes to `__external__` module sources are not detected; see
+            `_autogen_cache_key`.
+
     Notes:
         This will partially override the __init__ file. By default everything
         up to the last comment / __future__ import is preserved, and everything
@@ -73,9 +81,28 @@ def autogen_init(modpath_or_name, submodules=None, respect_all=True, options=Non
     logger.info('Autogenerating __init__ for modpath_or_name={}'.format(modpath_or_name))
 
     modpath = _rectify_to_modpath(modpath_or_name)
-    initstr = static_init(modpath, submodules=submodules,
-                          respect_all=respect_all, options=options)
-    init_fpath, new_text = _insert_autogen_text(modpath, initstr)
+
+    new_text = None
+    if cache:
+        cache_fpath = _autogen_cache_fpath(modpath)
+        cache_key = _autogen_cache_key(modpath, submodules, respect_all,
+                                       options)
+        try:
+            with open(cache_fpath, 'r') as file_:
+                cached_key, _, cached_text = file_.read().partition('\n')
+        except (IOError, OSError):
+            pass
+        else:
+            if cached_key == cache_key:
+                logger.debug('autogen cache hit: {!r}'.format(cache_fpath))
+                new_text = cached_text
+
+    if new_text is None:
+        initstr = static_init(modpath, submodules=submodules,
+                              respect_all=respect_all, options=options)
+        init_fpath, new_text = _insert_autogen_text(modpath, initstr)
+    else:
+        init_fpath = join(modpath, '__init__.py')
     if dry:
         logger.info('(DRY) would write updated file: %r' % init_fpath)
         if diff:
@@ -95,8 +122,74 @@ def autogen_init(modpath_or_name, submodules=None, respect_all=True, options=Non
     else:
         logger.info('writing updated file: %r' % init_fpath)
         print(new_text)
-        with open(init_fpath, 'w') as file_:
-            file_.write(new_text)
+        # encode once and write through a raw descriptor, skipping the
+        # TextIOWrapper buffering and incremental-encoder layers
+        data = new_text.encode('utf-8')
+        fd = os.open(init_fpath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        if cache:
+            # Store under the key for the sources as just written so a clean
+            # re-run over an unchanged package is a cache hit.
+            cache_key = _autogen_cache_key(modpath, submodules, respect_all,
+                                           options)
+            _atomic_write(_autogen_cache_fpath(modpath),
+                          cache_key + '\n' + new_text)
+
+
+def _autogen_cache_fpath(modpath):
+    """ Location of the cached autogenerated text for a package """
+    return join(modpath, '.mkinit_cache', 'autogen_init.txt')
+
+
+def _autogen_cache_key(modpath, submodules, respect_all, options):
+    """
+    Cache key for the autogenerated text of a package.
+
+    Hashes the modpath-relative name and content of each of the package's
+    source files together with the mkinit version and the generation
+    arguments, so any source, layout, or configuration change invalidates
+    the entry.
+
+    Notes:
+        Sources of `__external__` modules live outside the package and are
+        not hashed, so changes to them (e.g. after a Python upgrade) are not
+        detected; use `--no-cache` or remove `.mkinit_cache` in that case.
+    """
+    from mkinit import __version__
+    from mkinit.formatting import _ensure_options
+    options = _ensure_options(options)
+    hasher = hashlib.sha256()
+    fpaths = sorted(static.package_modpaths(
+        modpath, with_pkg=True, recursive=False, check=False))
+    for fpath in fpaths:
+        rel_fpath = relpath(fpath, modpath).replace('\\', '/')
+        hasher.update(rel_fpath.encode('utf-8'))
+        hasher.update(b'|')
+        try:
+            with open(fpath, 'rb') as file_:
+                hasher.update(file_.read())
+        except (IOError, OSError):  # nocover
+            pass
+        hasher.update(b'|')
+    hasher.update(__version__.encode('utf-8'))
+    hasher.update(repr(submodules).encode('utf-8'))
+    hasher.update(repr(respect_all).encode('utf-8'))
+    hasher.update(repr(sorted(options.items())).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _atomic_write(fpath, text):
+    """ writes text to fpath via a temp file and an atomic rename """
+    dpath = dirname(fpath)
+    if not exists(dpath):
+        os.makedirs(dpath)
+    tmp_fpath = fpath + '.tmp.{}'.format(os.getpid())
+    with open(tmp_fpath, 'w') as file_:
+        file_.write(text)
+    os.replace(tmp_fpath, fpath)
 
 
 def _rectify_to_modpath(modpath_or_name):
@@ -248,12 +341,8 @@ def _extract_attributes(modpath, respect_all=True):
         >>> _extract_attributes(modpath)
     """
     try:
-        if six.PY2:
-            with open(modpath, 'r') as file:
-                source = file.read()
-        else:
-            with open(modpath, 'r', encoding='utf8') as file:
-                source = file.read()
+        with open(modpath, 'r', encoding='utf8') as file:
+            source = file.read()
     except Exception as ex:  # nocover
         raise IOError('Error reading {}, caused by {}'.format(modpath, repr(ex)))
     valid_attrs = None
@@ -2,7 +2,6 @@
 # from collections import OrderedDict
 from __future__ import absolute_import, division, print_function, unicode_literals
 import ast
-import six
 # from ubelt.orderedset import OrderedSet as oset
 from ordered_set import OrderedSet as oset
 
@@ -273,20 +272,10 @@ def static_truthiness(node):
         return bool(node.elts)
     elif isinstance(node, ast.Num):
         return bool(node.n)
-    elif six.PY3 and isinstance(node, ast.Bytes):  # nocover
+    elif isinstance(node, ast.Bytes):  # nocover
         return bool(node.s)
-    elif six.PY3 and isinstance(node, ast.NameConstant):
+    elif isinstance(node, ast.NameConstant):
         return bool(node.value)
-    elif six.PY2 and isinstance(node, ast.Name):  # nocover
-        constants_lookup = {
-            'True': True,
-            'False': False,
-            'None': None,
-        }
-        try:
-            return bool(constants_lookup[node.id])
-        except KeyError:
-            return _UNHANDLED
     else:
         return _UNHANDLED
 
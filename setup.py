@@ -147,6 +147,7 @@ if __name__ == '__main__':
             ]
         },
         install_requires=parse_requirements('requirements/runtime.txt'),
+        python_requires='>=3.5',
         extras_require={
             'all': parse_requirements('requirements.txt'),
             'tests': parse_requirements('requirements/tests.txt'),
@@ -166,7 +167,6 @@ if __name__ == '__main__':
             # This should be interpreted as Apache License v2.0
             'License :: OSI Approved :: Apache Software License',
             # Supported Python versions
-            'Programming Language :: Python :: 2.7',
             'Programming Language :: Python :: 3',
         ],
     )
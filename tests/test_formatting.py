@@ -1,5 +1,8 @@
 from xdoctest import utils
+from mkinit import static_analysis
 from mkinit.formatting import _find_insert_points
+from mkinit.formatting import _INDENTED_LINE_RE
+from mkinit.formatting import _MULTILINE_HINT_RE
 
 
 def test_explicit_insert_points():
@@ -68,6 +71,80 @@ def test_empty_insert_points():
     assert (start, end, indent) == (0, 0, '')
 
 
+def test_implicit_insert_points_fast_path():
+    # no brackets, backslashes, or triple quotes: takes the fast path that
+    # skips the statement parse
+    lines = utils.codeblock(
+        '''
+        from __future__ import absolute_import
+        __version__ = '1.0'
+        clobbered = True
+        ''').split('\n')
+    src = '\n'.join(lines)
+    assert _MULTILINE_HINT_RE.search(src) is None
+    assert _INDENTED_LINE_RE.search(src) is None
+    start, end, indent = _find_insert_points(lines)
+    assert (start, end, indent) == (2, 3, '')
+
+
+def test_implicit_insert_points_slow_path():
+    # same layout, but the parenthesized continuation forces the statement
+    # parse to find the end of the multiline import
+    lines = utils.codeblock(
+        '''
+        from __future__ import (absolute_import,
+            division)
+        __version__ = '1.0'
+        clobbered = True
+        ''').split('\n')
+    assert _MULTILINE_HINT_RE.search('\n'.join(lines)) is not None
+    start, end, indent = _find_insert_points(lines)
+    assert (start, end, indent) == (3, 4, '')
+
+
+def test_explicit_insert_points_slow_path():
+    # tag handling must behave the same when a multiline statement forces
+    # the statement parse (the tagged variant without brackets is covered by
+    # test_explicit_insert_points)
+    lines = utils.codeblock(
+        '''
+        preserved1 = (True,
+                      False)
+        if True:
+            # <AUTOGEN_INIT>
+            clobbered2 = True
+            # </AUTOGEN_INIT>
+        preserved3 = True
+        ''').split('\n')
+    assert _MULTILINE_HINT_RE.search('\n'.join(lines)) is not None
+    start, end, indent = _find_insert_points(lines)
+    assert (start, end, indent) == (4, 5, '    ')
+
+
+def test_indented_line_forces_statement_parse():
+    # an indented comment (or tag) directly after an implicit-pattern line is
+    # not a statement start, so it must take the parsed path; appending an
+    # unrelated bracket (another way of forcing the parse) must not change
+    # the chosen points
+    lines = [
+        "__version__ = '1.0'\n",
+        '    # <AUTOGEN_INIT>\n',
+        '# a comment\n',
+    ]
+    assert _INDENTED_LINE_RE.search(''.join(lines)) is not None
+    start, end, indent = _find_insert_points(list(lines))
+    assert (start, end, indent) == (3, 3, '')
+
+    start, end, indent = _find_insert_points(lines + ['z = (1)\n'])
+    assert (start, end, indent) == (3, 4, '')
+
+
+def test_locate_statement_linenos():
+    lines = ['x = [1, 2,', '     3]', '# comment', 'def foo():', '    pass']
+    linenos = static_analysis._locate_statement_linenos(lines)
+    assert linenos == [0, 2, 3]
+
+
 def test_implicit_stacked_insert_points():
     lines = utils.codeblock(
         '''
@@ -1,7 +1,9 @@
 """
 Tests run on a dummy package
 """
+import os
 import ubelt as ub
+from os.path import exists
 from os.path import join
 
 
@@ -40,10 +42,10 @@ def make_dummy_package(dpath, pkgname='mkinit_dummy_module'):
 
     ub.writeto(paths['submod1'], ub.codeblock(
         '''
-        import six
+        import itertools
 
         attr1 = True
-        attr2 = six.moves.zip
+        attr2 = itertools.chain
 
         # ------------------------
 
@@ -247,6 +249,89 @@ def test_static_find_locals():
     print('imports = {!r}'.format(imports))
 
 
+def test_autogen_cache_second_run_hits():
+    """
+    python ~/code/mkinit/tests/test_with_dummy.py test_autogen_cache_second_run_hits
+    """
+    import mkinit
+    from mkinit import static_mkinit
+    cache_dpath = ub.ensure_app_cache_dir('mkinit/tests')
+    paths = make_dummy_package(cache_dpath, 'cache_hit_dummy')
+    modpath = paths['root']
+    mkinit.autogen_init(modpath)
+    with open(paths['root_init']) as file:
+        first_text = file.read()
+
+    calls = []
+    real_static_init = static_mkinit.static_init
+
+    def _counting_static_init(*args, **kwargs):
+        calls.append(args)
+        return real_static_init(*args, **kwargs)
+
+    static_mkinit.static_init = _counting_static_init
+    try:
+        mkinit.autogen_init(modpath)
+    finally:
+        static_mkinit.static_init = real_static_init
+
+    with open(paths['root_init']) as file:
+        second_text = file.read()
+    assert not calls, 'an unchanged package should reuse the cached text'
+    assert second_text == first_text
+
+
+def test_autogen_cache_edit_invalidates():
+    """
+    python ~/code/mkinit/tests/test_with_dummy.py test_autogen_cache_edit_invalidates
+    """
+    import mkinit
+    cache_dpath = ub.ensure_app_cache_dir('mkinit/tests')
+    paths = make_dummy_package(cache_dpath, 'cache_edit_dummy')
+    modpath = paths['root']
+    mkinit.autogen_init(modpath)
+    with open(paths['submod1'], 'a') as file:
+        file.write('\nbrand_new_attr = 1\n')
+    mkinit.autogen_init(modpath)
+    with open(paths['root_init']) as file:
+        text = file.read()
+    assert 'brand_new_attr' in text
+
+
+def test_autogen_cache_rename_invalidates():
+    """
+    Regression test: the cache key must cover file names, not just file
+    contents, otherwise a rename produces a stale hit.
+
+    python ~/code/mkinit/tests/test_with_dummy.py test_autogen_cache_rename_invalidates
+    """
+    import mkinit
+    cache_dpath = ub.ensure_app_cache_dir('mkinit/tests')
+    paths = make_dummy_package(cache_dpath, 'cache_rename_dummy')
+    modpath = paths['root']
+    mkinit.autogen_init(modpath)
+    os.rename(paths['submod1'], join(modpath, 'submod1x.py'))
+    mkinit.autogen_init(modpath)
+    with open(paths['root_init']) as file:
+        text = file.read()
+    assert 'import submod1x' in text
+    assert 'import submod1\n' not in text
+
+
+def test_autogen_no_cache():
+    """
+    python ~/code/mkinit/tests/test_with_dummy.py test_autogen_no_cache
+    """
+    import mkinit
+    cache_dpath = ub.ensure_app_cache_dir('mkinit/tests')
+    paths = make_dummy_package(cache_dpath, 'no_cache_dummy')
+    modpath = paths['root']
+    mkinit.autogen_init(modpath, cache=False)
+    assert not exists(join(modpath, '.mkinit_cache'))
+    with open(paths['root_init']) as file:
+        check_dummy_root_init(file.read())
+
+
 def test_dynamic_init():
     """
     python ~/code/mkinit/tests/test_with_dummy.py test_dynamic_init